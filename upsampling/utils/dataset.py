@@ -10,11 +10,17 @@ import torchvision.transforms as transforms
 
 from .const import mean, std, img_formats
 
+try:
+    from torchvision.io import read_file, decode_jpeg, ImageReadMode
+    _nvjpeg_available = True
+except ImportError:
+    _nvjpeg_available = False
+
 
 class Sequence:
     def __init__(self):
-        normalize = transforms.Normalize(mean=mean, std=std)
-        self.transform = transforms.Compose([transforms.ToTensor(), normalize])
+        self.normalize = transforms.Normalize(mean=mean, std=std)
+        self.transform = transforms.Compose([transforms.ToTensor(), self.normalize])
 
     def __iter__(self):
         return self
@@ -27,9 +33,12 @@ class Sequence:
 
 
 class ImageSequence(Sequence):
-    def __init__(self, imgs_dirpath: str, fps: float):
+    def __init__(self, imgs_dirpath: str, fps: float, device=None):
         super().__init__()
         self.fps = fps
+        # Target device of the consuming pipeline; frames are only decoded on the GPU when
+        # inference runs there too.
+        self.device = None if device is None else torch.device(device)
 
         assert os.path.isdir(imgs_dirpath)
         self.imgs_dirpath = imgs_dirpath
@@ -45,14 +54,32 @@ class ImageSequence(Sequence):
     def __next__(self):
         for idx in range(0, len(self.file_names) - 1):
             file_paths = self._get_path_from_name([self.file_names[idx], self.file_names[idx + 1]])
-            imgs = list()
-            for file_path in file_paths:
-                img = self._pil_loader(file_path)
-                img = self.transform(img)
-                imgs.append(img)
+            imgs = [self._load_img(file_path) for file_path in file_paths]
             times_sec = [idx/self.fps, (idx + 1)/self.fps]
             yield imgs, times_sec
 
+    def _load_img(self, file_path: str) -> torch.Tensor:
+        # Decode JPEGs with nvJPEG straight onto the GPU when possible; this skips the host
+        # decode and the subsequent H2D copy. Everything else goes through PIL on the host.
+        if _nvjpeg_available and self.device is not None and self.device.type == 'cuda' \
+                and torch.cuda.is_available() \
+                and Path(file_path).suffix.lower() in {'.jpg', '.jpeg'}:
+            try:
+                # Force 3 channels like the PIL path's convert('RGB'); grayscale or CMYK
+                # JPEGs would otherwise break the 3-channel normalization.
+                img = decode_jpeg(read_file(file_path), mode=ImageReadMode.RGB, device=self.device)
+            except RuntimeError:
+                pass
+            else:
+                _, h_orig, w_orig = img.shape
+                w, h = w_orig//32*32, h_orig//32*32
+                left = (w_orig - w)//2
+                upper = (h_orig - h)//2
+                img = img[:, upper:upper + h, left:left + w]
+                return self.normalize(img.float().div_(255))
+        img = self._pil_loader(file_path)
+        return self.transform(img)
+
     def __len__(self):
         return len(self.file_names) - 1
 
@@ -1,5 +1,7 @@
 # Taken from https://github.com/avinashpaliwal/Super-SloMo/blob/bbf0375958d66dab48143166a5b80cd26a406458/model.py
 
+from typing import Optional
+
 import torch
 import torchvision
 import torchvision.transforms as transforms
@@ -227,26 +229,40 @@ class backWarp(nn.Module):
         block.
     """
 
-    def __init__(self, W, H, device):
+    def __init__(self, W=None, H=None, device=None):
         """
         Parameters
         ----------
-            W : int
-                width of the image.
-            H : int
+            W : int, optional
+                width of the image. If omitted, the grid is built lazily from the
+                first flow passed to forward.
+            H : int, optional
                 height of the image.
-            device : device
-                computation device (cpu/cuda). 
+            device : device, optional
+                computation device (cpu/cuda).
         """
 
 
         super(backWarp, self).__init__()
-        # create a grid
-        gridX, gridY = np.meshgrid(np.arange(W), np.arange(H))
+        # Non-persistent buffers: they follow the module across devices but stay out of the
+        # state dict. Only the grid of the most recently seen resolution is kept, so one
+        # module serves multi-resolution datasets with bounded memory.
+        self.register_buffer('gridX', torch.empty(0), persistent=False)
+        self.register_buffer('gridY', torch.empty(0), persistent=False)
+        self.W = 0
+        self.H = 0
+        if W is not None and H is not None:
+            self._build_grid(H, W, device)
+
+    def _build_grid(self, H: int, W: int, device: Optional[torch.device]):
+        gridY, gridX = torch.meshgrid(
+            torch.arange(H, dtype=torch.float32, device=device),
+            torch.arange(W, dtype=torch.float32, device=device),
+            indexing='ij')
+        self.gridX = gridX
+        self.gridY = gridY
         self.W = W
         self.H = H
-        self.gridX = torch.tensor(gridX, requires_grad=False, device=device)
-        self.gridY = torch.tensor(gridY, requires_grad=False, device=device)
 
     def forward(self, img, flow):
         """
@@ -268,11 +284,18 @@ class backWarp(nn.Module):
         """
 
 
+        # Element-wise shape check (rather than tuple comparison) so the module stays
+        # TorchScript-compatible for the script_model path.
+        H = flow.shape[2]
+        W = flow.shape[3]
+        if self.gridX.dim() != 2 or self.gridX.shape[0] != H or self.gridX.shape[1] != W \
+                or self.gridX.device != flow.device:
+            self._build_grid(H, W, flow.device)
         # Extract horizontal and vertical flows.
         u = flow[:, 0, :, :]
         v = flow[:, 1, :, :]
-        x = self.gridX.unsqueeze(0).expand_as(u).float() + u
-        y = self.gridY.unsqueeze(0).expand_as(v).float() + v
+        x = self.gridX.unsqueeze(0).expand_as(u) + u
+        y = self.gridY.unsqueeze(0).expand_as(v) + v
         # range -1 to 1
         x = 2*(x/self.W - 0.5)
         y = 2*(y/self.H - 0.5)
@@ -35,14 +35,14 @@ def fps_from_file(fps_file) -> float:
     assert fps > 0, 'Expected fps to be larger than 0. Instead got fps={}'.format(fps)
     return fps
 
-def get_sequence_or_none(dirpath: str) -> Union[None, Sequence]:
+def get_sequence_or_none(dirpath: str, device=None) -> Union[None, Sequence]:
     fps_file = get_fps_file(dirpath)
     if fps_file:
         # Must be a sequence (either ImageSequence or VideoSequence)
         fps = fps_from_file(fps_file)
         imgs_dir = get_imgs_directory(dirpath)
         if imgs_dir:
-            return ImageSequence(imgs_dir, fps)
+            return ImageSequence(imgs_dir, fps, device=device)
         video_file = get_video_file(dirpath)
         assert video_file is not None
         return VideoSequence(video_file, fps)